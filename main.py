@@ -1,9 +1,12 @@
-from flask import Flask, render_template, request, redirect, url_for, session
+from flask import Flask, render_template, request, session
+from concurrent.futures import ThreadPoolExecutor
 import mylib
-import json
 
 app = Flask(__name__)
 app.secret_key = 'abc123e'
+# Shared across requests: runs the sentiment path's headline fetch while the
+# request thread fetches the stock data
+executor = ThreadPoolExecutor()
 init = 'yes'
 message_json = [] 
 
@@ -37,12 +40,16 @@ def ticker_analysis():
     analyse = request.form['analyse'].rstrip()
     ticker = f"{ticker}{exchange}"
     output = ""
+    # Headlines are only needed for the sentiment analysis; when they are,
+    # fetch them on the pool while this thread fetches the stock data
+    headlines_future = None
+    if analyse == 'sentiment':
+        headlines_future = executor.submit(mylib.fetch_news_headlines, ticker)
     stock_data = mylib.fetch_stock_data(ticker=ticker)
-    headlines = mylib.fetch_news_headlines(ticker)
     # Fetch stock data
     if not stock_data.empty:
-        if analyse == 'sentiment':
-            output = mylib.analyze_stock_sentiment(headlines)
+        if headlines_future is not None:
+            output = mylib.analyze_stock_sentiment(headlines_future.result())
         else:
             output = mylib.analyze_data(stock_data=stock_data)
         #message = mylib.analyze_data(stock_data=stock_data)
@@ -90,7 +97,7 @@ def validateQ():
     answer, message = mylib.validateAnw(message=message,answer=user_input)
     #answer = 'this is a experiment answer'
     session['message'] = message
-    print (message)
+    app.logger.debug("Conversation has %d messages after validation", len(message))
     return render_template('validateQ.html', validation = answer)
 
 
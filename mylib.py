@@ -1,66 +1,139 @@
-from flask import Flask, render_template, request, redirect, url_for, session
 from openai import OpenAI
 from dotenv import load_dotenv
 from newsapi import NewsApiClient
 import os
-import mylib
-import yfinance as yf
+import requests
 import datetime
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
 
 load_dotenv()
 client = OpenAI(
-        api_key=os.environ.get("OPENAI_API_KEY")
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        timeout=60.0
         )
+# A shared session keeps the NewsAPI HTTPS connection alive between requests
 newsapi = NewsApiClient(
-        api_key=os.environ.get("YOUR_NEWSAPI_API_KEY")
+        api_key=os.environ.get("YOUR_NEWSAPI_API_KEY"),
+        session=requests.Session()
         )
 
+SENTIMENT_SYSTEM_CONTENT = "Share Market Analyst specialied is calculating sentiment score"
+ANALYSIS_SYSTEM_CONTENT = "Share Market Analyst specialied is picking growth shares"
+
+# Daily bars barely move within a few minutes, so repeat lookups of the same
+# ticker are served from memory instead of going back to Yahoo.
+STOCK_CACHE_TTL = 300
+STOCK_CACHE_MAXSIZE = 128
+# Only the most relevant headlines feed the sentiment prompt
+NEWS_PAGE_SIZE = 30
+NEWS_CACHE_TTL = 900
+NEWS_CACHE_MAXSIZE = 128
+# A ticker's long name practically never changes
+COMPANY_CACHE_TTL = 86400
+COMPANY_CACHE_MAXSIZE = 256
+
+ANALYSIS_CACHE_TTL = 900
+ANALYSIS_CACHE_MAXSIZE = 256
+
+_stock_cache = OrderedDict()
+_news_cache = OrderedDict()
+_company_cache = OrderedDict()
+_analysis_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def cache_get(cache, key):
+    with _cache_lock:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if time.monotonic() >= expires:
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return value
+
+def cache_put(cache, key, value, ttl, maxsize):
+    with _cache_lock:
+        cache[key] = (time.monotonic() + ttl, value)
+        cache.move_to_end(key)
+        while len(cache) > maxsize:
+            cache.popitem(last=False)
+
 def analyze_stock_sentiment(headlines):
     combined_news = " ".join(headlines)
     my_message = [] 
     # Create the analysis prompt
     prompt = f"Analyze the following news headlines and provide a sentiment score between -1 (very bearish) to 1 (very bullish):\n\n{combined_news}"
-    system_content = "Share Market Analyst specialied is calculating sentiment score"
-    message = msgAppend(message=my_message, role='system',content=system_content    ) 
+    message = msgAppend(message=my_message, role='system',content=SENTIMENT_SYSTEM_CONTENT) 
     message = msgAppend(message= message, role='user',content=prompt)
-    analysis = mylib.request2ai(message=message)
-    analysis = mylib.chatcompletion2message(response=analysis)
-    analysis = mylib.strings2html(analysis)
+    analysis = cached_request2ai(message=message)
+    analysis = strings2html(analysis)
     return analysis
 
 
 def fetch_stock_data(ticker):
+    hist = cache_get(_stock_cache, ticker)
+    if hist is not None:
+        return hist
+    # Imported here so processes that only serve the tutor pages never load
+    # yfinance and the pandas/numpy stack it pulls in
+    import yfinance as yf
     stock = yf.Ticker(ticker)
-    hist = stock.history(period="3mo", interval="1d")
+    # Dividends and splits are not used by the analysis, so skip fetching them
+    hist = stock.history(period="3mo", interval="1d", actions=False)
+    # yfinance returns an empty frame on transient errors, so don't cache misses
+    if not hist.empty:
+        cache_put(_stock_cache, ticker, hist, STOCK_CACHE_TTL, STOCK_CACHE_MAXSIZE)
     return hist
 
+def fetch_company_name(stock):
+    company_name = cache_get(_company_cache, stock)
+    if company_name is not None:
+        return company_name
+    import yfinance as yf
+    company_info = yf.Ticker(stock).info
+    company_name = company_info.get('longName')
+    if company_name is None:
+        # Missing longName is often a transient Yahoo hiccup, so retry next time
+        return 'N/A'
+    cache_put(_company_cache, stock, company_name, COMPANY_CACHE_TTL, COMPANY_CACHE_MAXSIZE)
+    return company_name
+
 # Function to fetch news headlines for a stock
 def fetch_news_headlines(stock):
-    ticker = yf.Ticker(stock)
-    company_info = ticker.info
-    company_name = company_info.get('longName', 'N/A')
+    headlines = cache_get(_news_cache, stock)
+    if headlines is not None:
+        return headlines
+    company_name = fetch_company_name(stock)
 
-    query = stock.split('.')[0]  # Remove the '.AX' suffix for the query
     today = datetime.date.today()
     last_year = today - datetime.timedelta(days=30)
     
-    articles = newsapi.get_everything(q=company_name, from_param=last_year, to=today, language='en', sort_by='relevancy')
+    articles = newsapi.get_everything(q=company_name, from_param=last_year, to=today, language='en', sort_by='relevancy', page_size=NEWS_PAGE_SIZE)
     headlines = [article['title'] for article in articles['articles']]
+    # Headlines searched under the 'N/A' fallback name are not worth keeping
+    if company_name != 'N/A':
+        cache_put(_news_cache, stock, headlines, NEWS_CACHE_TTL, NEWS_CACHE_MAXSIZE)
     return headlines
 
 
 def analyze_data(stock_data):
-    # Convert the DataFrame to a dictionary for easier processing in the prompt
-    stock_data_dict = stock_data.to_dict(orient='records')
+    # Convert the DataFrame to compact CSV for the prompt: column names appear
+    # once instead of on every row. Prices keep 6 significant figures rather
+    # than fixed decimals so sub-cent moves on penny stocks survive.
+    stock_data_csv = stock_data.to_csv(float_format='%.6g')
     my_message = [] 
     # Create the analysis prompt
-    prompt = f"Analyze the following stock data: {stock_data_dict}. What are the key trends and potential future movements?"
-    system_content = "Share Market Analyst specialied is picking growth shares"
-    message = msgAppend(message=my_message, role='system',content=system_content    ) 
+    prompt = f"Analyze the following stock data: {stock_data_csv}. What are the key trends and potential future movements?"
+    message = msgAppend(message=my_message, role='system',content=ANALYSIS_SYSTEM_CONTENT) 
     message = msgAppend(message= message, role='user',content=prompt)
-    analysis = mylib.request2ai(message=message)
-    analysis = mylib.chatcompletion2message(response=analysis)
-    analysis = mylib.strings2html(analysis)
+    analysis = cached_request2ai(message=message)
+    analysis = strings2html(analysis)
     return analysis
 
 
@@ -76,6 +149,16 @@ def strings2html (string):
 def chatcompletion2message(response):
     return response.choices[0].message.content
 
+def cached_request2ai(message):
+    # Identical analysis prompts (same ticker data or headlines) reuse the
+    # earlier completion instead of another round trip to OpenAI
+    key = hashlib.sha256(json.dumps(message, sort_keys=True).encode()).hexdigest()
+    content = cache_get(_analysis_cache, key)
+    if content is None:
+        content = chatcompletion2message(response=request2ai(message=message))
+        cache_put(_analysis_cache, key, content, ANALYSIS_CACHE_TTL, ANALYSIS_CACHE_MAXSIZE)
+    return content
+
 def request2ai(message):
     response = client.chat.completions.create(
     model="gpt-4o",
@@ -93,11 +176,11 @@ def generateQ(init,message,student):
         system_content=f"You are an expert educational assistant tasked with creating engaging and thought-provoking questions for high school students in {student['state']} {student['country']}. The question should be suitable for {student['year']}, {student['term']} and cover subject {student['subject']} {student['specialist_area']}"
         user_content=f"Generating a question without the answer with a difficulty level {student['difficulty']} out of 5 to test the in-depth understanding of the subject"
 
-        message = mylib.msgAppend(message=message,role="system",content=system_content)
-        message = mylib.msgAppend(message=message,role="user",content=user_content)
+        message = msgAppend(message=message,role="system",content=system_content)
+        message = msgAppend(message=message,role="user",content=user_content)
     else:
         user_content= f"prompt another slightly difficult question"
-        message = mylib.msgAppend(message=message,role="user",content=user_content)
+        message = msgAppend(message=message,role="user",content=user_content)
 
     str = request2ai(message)
     question = chatcompletion2message(response=str)